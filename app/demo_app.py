@@ -5,7 +5,6 @@ Provides a dashboard and interactive triage interface for the hackathon project
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
 import os
@@ -19,6 +18,7 @@ from src.elastic_client import ElasticClient
 from src.config import config
 from src.agents.triage_agent import TriageAgent
 from src.agents.analytics_agent import AnalyticsAgent
+from src.embeddings import load_embedder
 
 st.set_page_config(
     page_title="Oilfield Incident Intelligence",
@@ -33,7 +33,8 @@ def get_clients():
     triage_agent = TriageAgent(
         config.agent.conversation_endpoint,
         config.agent.api_key,
-        elastic_client
+        elastic_client,
+        embedder=load_embedder(config.elastic.embedding_model)
     )
     analytics_agent = AnalyticsAgent(elastic_client, config.elastic.index_name)
     return elastic_client, triage_agent, analytics_agent
@@ -44,6 +45,51 @@ except Exception as e:
     st.error(f"Failed to connect to services: {e}")
     st.stop()
 
+# Cached analytics - every widget interaction reruns this script, so serve
+# repeat renders from memory instead of re-querying Elasticsearch.
+# The leading underscore on _aa keeps Streamlit from hashing the agent.
+@st.cache_data(ttl=60)
+def _dashboard_bundle(_aa):
+    return _aa.dashboard_bundle(30)
+
+@st.cache_data(ttl=24 * 60 * 60)
+def _high_risk_locations(_aa):
+    return _aa.get_high_risk_locations()
+
+@st.cache_data(ttl=24 * 60 * 60)
+def _mttr_by_type(_aa):
+    return _aa.get_mttr_by_type()
+
+@st.cache_data(ttl=60)
+def _result_frame(rows, columns):
+    return pd.DataFrame(rows, columns=[c["name"] for c in columns])
+
+# Chart factories - built with graph_objects directly and cached on the frame
+SEVERITY_COLORS = {'CRITICAL': 'red', 'HIGH': 'orange', 'MEDIUM': 'yellow', 'LOW': 'green'}
+
+@st.cache_data(ttl=60)
+def _severity_pie(df):
+    return go.Figure(go.Pie(
+        values=df['count'], labels=df['severity'],
+        marker=dict(colors=[SEVERITY_COLORS.get(s) for s in df['severity']])
+    ))
+
+@st.cache_data(ttl=60)
+def _trends_bar(df):
+    fig = go.Figure(go.Bar(
+        x=df['incident_type'], y=df['total_incidents'],
+        marker=dict(color=df['avg_severity_score'], showscale=True,
+                    colorbar=dict(title='avg_severity_score'))
+    ))
+    fig.update_layout(xaxis_title='incident_type', yaxis_title='total_incidents')
+    return fig
+
+@st.cache_data(ttl=24 * 60 * 60)
+def _mttr_line(df):
+    fig = go.Figure(go.Scatter(x=df['incident_type'], y=df['mttr_hours'], mode='lines+markers'))
+    fig.update_layout(xaxis_title='incident_type', yaxis_title='mttr_hours')
+    return fig
+
 # Sidebar
 st.sidebar.title("🛢️ Oilfield Intelligence")
 menu = st.sidebar.radio("Navigation", ["Dashboard", "Incident Triage", "Historical Analysis", "Settings"])
@@ -51,8 +97,9 @@ menu = st.sidebar.radio("Navigation", ["Dashboard", "Incident Triage", "Historic
 if menu == "Dashboard":
     st.title("Operations Command Center")
 
-    # Get executive summary
-    summary = aa.generate_executive_summary()
+    # Summary, severity split and trends are independent - fetch them together
+    bundle = _dashboard_bundle(aa)
+    summary = bundle["summary"]
     ov = summary.get("overview", {})
 
     # Top-level metrics
@@ -67,19 +114,18 @@ if menu == "Dashboard":
 
     with col_l:
         st.subheader("Incidents by Severity")
-        sev_dist = aa.get_severity_distribution()
+        sev_dist = bundle["severity_distribution"]
         if "distribution" in sev_dist:
-            df_sev = pd.DataFrame(sev_dist["distribution"], columns=[c["name"] for c in sev_dist["columns"]])
-            fig = px.pie(df_sev, values='count', names='severity', color='severity',
-                         color_discrete_map={'CRITICAL': 'red', 'HIGH': 'orange', 'MEDIUM': 'yellow', 'LOW': 'green'})
+            df_sev = _result_frame(sev_dist["distribution"], sev_dist["columns"])
+            fig = _severity_pie(df_sev)
             st.plotly_chart(fig, use_container_width=True)
 
     with col_r:
         st.subheader("Incident Types Trend (30 Days)")
-        trends = aa.get_incident_trends(30)
+        trends = bundle["trends"]
         if "data" in trends:
-            df_trends = pd.DataFrame(trends["data"], columns=[c["name"] for c in trends["columns"]])
-            fig = px.bar(df_trends, x='incident_type', y='total_incidents', color='avg_severity_score')
+            df_trends = _result_frame(trends["data"], trends["columns"])
+            fig = _trends_bar(df_trends)
             st.plotly_chart(fig, use_container_width=True)
 
 elif menu == "Incident Triage":
@@ -115,7 +161,7 @@ elif menu == "Incident Triage":
 
                 st.subheader("Similar Historical Incidents")
                 keywords = result.get("similar_incidents_keywords", [])
-                similar = ta.get_similar_incidents(keywords)
+                similar = ta.get_similar_incidents(keywords, config.elastic.index_name, description)
                 if similar:
                     st.table(similar)
                 else:
@@ -125,17 +171,22 @@ elif menu == "Historical Analysis":
     st.title("ES|QL Data Exploration")
     st.write("Explore historical patterns and risk factors.")
 
-    risk_data = aa.get_high_risk_locations()
+    risk_data = _high_risk_locations(aa)
+    if "error" in risk_data:
+        # Don't keep a failed lookup around for a day
+        _high_risk_locations.clear()
     if "high_risk_locations" in risk_data:
         st.subheader("High Risk Field Locations")
-        df_risk = pd.DataFrame(risk_data["high_risk_locations"], columns=[c["name"] for c in risk_data["columns"]])
+        df_risk = _result_frame(risk_data["high_risk_locations"], risk_data["columns"])
         st.dataframe(df_risk, use_container_width=True)
 
     st.subheader("Mean Time to Resolution (MTTR) by Type")
-    mttr = aa.get_mttr_by_type()
+    mttr = _mttr_by_type(aa)
+    if "error" in mttr:
+        _mttr_by_type.clear()
     if "mttr_data" in mttr:
-        df_mttr = pd.DataFrame(mttr["mttr_data"], columns=[c["name"] for c in mttr["columns"]])
-        fig = px.line(df_mttr, x='incident_type', y='mttr_hours', markers=True)
+        df_mttr = _result_frame(mttr["mttr_data"], mttr["columns"])
+        fig = _mttr_line(df_mttr)
         st.plotly_chart(fig, use_container_width=True)
 
 elif menu == "Settings":
@@ -144,4 +195,5 @@ elif menu == "Settings":
     st.write(f"Elasticsearch URL: `{config.elastic.url}`")
     st.write(f"Index: `{config.elastic.index_name}`")
     st.write(f"Agent ID: `{config.agent.agent_id}`")
-    st.button("Reload System")
+    if st.button("Reload System"):
+        st.cache_data.clear()
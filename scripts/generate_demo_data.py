@@ -4,13 +4,13 @@ Generate synthetic oilfield incident data for demo purposes.
 Creates realistic incident scenarios for the Elasticsearch hackathon demo.
 """
 
-import json
-import random
+import sys
 import uuid
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Iterator, Optional
 
-random.seed(42)
+import numpy as np
+import orjson
 
 # Demo oilfield locations
 FIELDS = [
@@ -105,77 +105,178 @@ INCIDENT_SCENARIOS = [
 
 TEAMS = ["Emergency Response", "Well Control", "HSE Team", "Operations", "Maintenance", "Environmental"]
 STATUSES = ["OPEN", "IN_PROGRESS", "RESOLVED", "CLOSED"]
+ROOT_CAUSES = ["mechanical failure", "human error", "process deviation", "equipment degradation", "design deficiency"]
+CORRECTIVE_ACTIONS = ["Maintenance order raised", "Equipment replaced", "Procedure reviewed", "Training initiated", "Design modification planned"]
 
+# Severity codes index the per-severity (low, high) tables below (high exclusive)
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+SEVERITY_CODES = {sev: code for code, sev in enumerate(SEVERITIES)}
+SEVERITY_SCORE_RANGES = np.array([(80, 100), (60, 80), (40, 60), (10, 40)])
+RESOLUTION_HOUR_RANGES = np.array([(2, 48), (4, 72), (8, 168), (24, 336)], dtype=float)
+FINANCIAL_IMPACT_RANGES = np.array([(500000, 10000000), (50000, 500000), (5000, 50000), (500, 5000)], dtype=float)
+MAX_INJURIES = np.array([3, 2, 0, 0])
 
-def generate_incident(incident_num: int) -> Dict:
-    """Generate a single realistic incident record"""
-    scenario = random.choice(INCIDENT_SCENARIOS)
-    description = random.choice(scenario["descriptions"])
-    severity = random.choice(scenario["severity_weights"])
-    location = random.choice(FIELDS)
-
-    severity_scores = {"CRITICAL": random.randint(80, 99), "HIGH": random.randint(60, 79),
-                       "MEDIUM": random.randint(40, 59), "LOW": random.randint(10, 39)}
-    severity_score = severity_scores[severity]
-
-    days_ago = random.randint(0, 730)
-    timestamp = datetime.now() - timedelta(days=days_ago, hours=random.randint(0, 23))
-
-    injuries = 0
-    fatalities = 0
-    if severity == "CRITICAL":
-        injuries = random.randint(0, 3)
-        fatalities = random.randint(0, 1) if random.random() < 0.1 else 0
-    elif severity == "HIGH":
-        injuries = random.randint(0, 2)
-
-    resolution_hours = {"CRITICAL": random.uniform(2, 48), "HIGH": random.uniform(4, 72),
-                        "MEDIUM": random.uniform(8, 168), "LOW": random.uniform(24, 336)}
-
-    status = random.choice(STATUSES)
-    if status == "CLOSED":
-        status = "RESOLVED"
-
-    financial_impact = {
-        "CRITICAL": random.uniform(500000, 10000000),
-        "HIGH": random.uniform(50000, 500000),
-        "MEDIUM": random.uniform(5000, 50000),
-        "LOW": random.uniform(500, 5000)
-    }[severity]
-
-    return {
-        "incident_id": f"INC-{timestamp.year}-{incident_num:04d}",
-        "timestamp": timestamp.isoformat(),
-        "location": {
-            "field_name": location["field_name"],
-            "well_id": f"WELL-{random.randint(1, 50):03d}",
-            "region": location["region"],
-            "coordinates": {
-                "lat": location["lat"] + random.uniform(-0.5, 0.5),
-                "lon": location["lon"] + random.uniform(-0.5, 0.5)
-            }
-        },
-        "incident_type": scenario["type"],
-        "severity": severity,
-        "severity_score": severity_score,
-        "description": description,
-        "equipment_involved": random.choice(scenario["equipment"]),
-        "personnel_count": random.randint(2, 25),
-        "injuries": injuries,
-        "fatalities": fatalities,
-        "financial_impact": round(financial_impact, 2),
-        "root_cause": f"Under investigation - preliminary assessment indicates {random.choice(['mechanical failure', 'human error', 'process deviation', 'equipment degradation', 'design deficiency'])}",
-        "corrective_actions": f"Immediate isolation and assessment. {random.choice(['Maintenance order raised', 'Equipment replaced', 'Procedure reviewed', 'Training initiated', 'Design modification planned'])}.",
-        "status": status,
-        "assigned_team": random.choice(TEAMS),
-        "resolution_time_hours": round(resolution_hours[severity], 1) if status == "RESOLVED" else None,
-        "tags": [scenario["type"].lower(), severity.lower(), location["region"].lower().replace(" ", "-")]
-    }
+
+def _flatten_scenarios(key: str):
+    """
+    Flatten one ragged per-scenario list into (flat, offsets, lengths) so the
+    entries for scenario t are flat[offsets[t]:offsets[t] + lengths[t]].
+    """
+    lengths = np.array([len(s[key]) for s in INCIDENT_SCENARIOS])
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    flat = [item for s in INCIDENT_SCENARIOS for item in s[key]]
+    return flat, offsets, lengths
+
+
+# Scenario and field lookups, precompiled once so batch generation only does
+# integer indexing. Strings stay in plain lists to come out as str, not np.str_.
+SCENARIO_TYPES = [s["type"] for s in INCIDENT_SCENARIOS]
+DESC_FLAT, DESC_OFFSETS, DESC_LENS = _flatten_scenarios("descriptions")
+EQUIP_FLAT, EQUIP_OFFSETS, EQUIP_LENS = _flatten_scenarios("equipment")
+_sev_flat, SEV_OFFSETS, SEV_LENS = _flatten_scenarios("severity_weights")
+SEV_CODES_FLAT = np.array([SEVERITY_CODES[sev] for sev in _sev_flat])
+FIELD_LAT = np.array([f["lat"] for f in FIELDS])
+FIELD_LON = np.array([f["lon"] for f in FIELDS])
+
+# Every text value comes from this small vocabulary. Build the derived strings
+# (tags, sentences) once and intern them so records share one object per
+# value instead of formatting a fresh copy per incident.
+STATUS_VALUES = [sys.intern("RESOLVED" if status == "CLOSED" else status) for status in STATUSES]
+TEAM_VALUES = [sys.intern(team) for team in TEAMS]
+FIELD_NAMES = [sys.intern(f["field_name"]) for f in FIELDS]
+FIELD_REGIONS = [sys.intern(f["region"]) for f in FIELDS]
+REGION_TAGS = [sys.intern(f["region"].lower().replace(" ", "-")) for f in FIELDS]
+SCENARIO_TAGS = [sys.intern(t.lower()) for t in SCENARIO_TYPES]
+SEVERITY_TAGS = [sys.intern(sev.lower()) for sev in SEVERITIES]
+ROOT_CAUSE_TEXT = [
+    sys.intern(f"Under investigation - preliminary assessment indicates {cause}")
+    for cause in ROOT_CAUSES
+]
+CORRECTIVE_ACTION_TEXT = [
+    sys.intern(f"Immediate isolation and assessment. {action}.")
+    for action in CORRECTIVE_ACTIONS
+]
+
+
+def _scale(ranges: np.ndarray, sev_codes: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Map uniforms in [0, 1) onto each record's severity-specific [low, high) range"""
+    low = ranges[sev_codes, 0]
+    return low + u * (ranges[sev_codes, 1] - low)
+
+
+def _fill_severity_derived(sev_codes: np.ndarray, rng: np.random.Generator):
+    """
+    Draw the severity-dependent columns in one pass: a single uniform per
+    record per column, scaled through the per-severity lookup tables.
+    Returns (severity_score, resolution_hours, financial_impact, injuries).
+    """
+    n = len(sev_codes)
+    rnd_score, rnd_res, rnd_impact, rnd_injury = rng.random((4, n))
+    severity_score = _scale(SEVERITY_SCORE_RANGES, sev_codes, rnd_score).astype(np.int64)
+    resolution_hours = _scale(RESOLUTION_HOUR_RANGES, sev_codes, rnd_res)
+    financial_impact = _scale(FINANCIAL_IMPACT_RANGES, sev_codes, rnd_impact)
+    injuries = (rnd_injury * (MAX_INJURIES[sev_codes] + 1)).astype(np.int64)
+    return severity_score, resolution_hours, financial_impact, injuries
+
+
+def _generate_batch(rng: np.random.Generator, first_num: int, n: int) -> List[Dict]:
+    """
+    Generate n incident records numbered from first_num.
+    Every column is drawn as a flat NumPy array in one vectorized pass;
+    Python objects are only built once, when the records are zipped together.
+    """
+    # Categorical picks - positions into the flattened scenario lookups
+    scenario_idx = rng.integers(0, len(INCIDENT_SCENARIOS), n)
+    field_idx = rng.integers(0, len(FIELDS), n)
+    desc_pos = DESC_OFFSETS[scenario_idx] + rng.integers(0, DESC_LENS[scenario_idx])
+    equip_pos = EQUIP_OFFSETS[scenario_idx] + rng.integers(0, EQUIP_LENS[scenario_idx])
+    sev_codes = SEV_CODES_FLAT[SEV_OFFSETS[scenario_idx] + rng.integers(0, SEV_LENS[scenario_idx])]
+
+    # Severity-derived numeric columns
+    severity_score, resolution_hours, financial_impact, injuries = _fill_severity_derived(sev_codes, rng)
+    fatalities = np.where((sev_codes == SEVERITY_CODES["CRITICAL"]) & (rng.random(n) < 0.1),
+                          rng.integers(0, 2, n), 0)
+
+    # Time and place
+    days_ago = rng.integers(0, 731, n)
+    hours_ago = rng.integers(0, 24, n)
+    timestamps = (np.datetime64(datetime.now(), "us")
+                  - days_ago.astype("timedelta64[D]") - hours_ago.astype("timedelta64[h]"))
+    timestamp_iso = np.datetime_as_string(timestamps, unit="us").tolist()
+    years = (timestamps.astype("datetime64[Y]").astype(np.int64) + 1970).tolist()
+    incident_ids = [f"INC-{year}-{num:04d}" for year, num in zip(years, range(first_num, first_num + n))]
+
+    lat = FIELD_LAT[field_idx] + rng.uniform(-0.5, 0.5, n)
+    lon = FIELD_LON[field_idx] + rng.uniform(-0.5, 0.5, n)
+    well_num = rng.integers(1, 51, n)
+
+    # Remaining categorical columns
+    status_idx = rng.integers(0, len(STATUSES), n)
+    statuses = [STATUS_VALUES[i] for i in status_idx.tolist()]
+    personnel = rng.integers(2, 26, n)
+    root_cause_idx = rng.integers(0, len(ROOT_CAUSES), n)
+    action_idx = rng.integers(0, len(CORRECTIVE_ACTIONS), n)
+    team_idx = rng.integers(0, len(TEAMS), n)
+
+    columns = (
+        incident_ids, timestamp_iso, scenario_idx.tolist(), field_idx.tolist(),
+        desc_pos.tolist(), equip_pos.tolist(), sev_codes.tolist(), severity_score.tolist(),
+        lat.tolist(), lon.tolist(), well_num.tolist(), personnel.tolist(),
+        injuries.tolist(), fatalities.tolist(), np.round(financial_impact, 2).tolist(),
+        np.round(resolution_hours, 1).tolist(), statuses, root_cause_idx.tolist(),
+        action_idx.tolist(), team_idx.tolist(),
+    )
+
+    return [
+        {
+            "incident_id": incident_id,
+            "timestamp": ts,
+            "location": {
+                "field_name": FIELD_NAMES[f],
+                "well_id": f"WELL-{well:03d}",
+                "region": FIELD_REGIONS[f],
+                "coordinates": {"lat": la, "lon": lo}
+            },
+            "incident_type": SCENARIO_TYPES[s],
+            "severity": SEVERITIES[sev],
+            "severity_score": score,
+            "description": DESC_FLAT[d],
+            "equipment_involved": EQUIP_FLAT[e],
+            "personnel_count": pers,
+            "injuries": inj,
+            "fatalities": fat,
+            "financial_impact": impact,
+            "root_cause": ROOT_CAUSE_TEXT[rc],
+            "corrective_actions": CORRECTIVE_ACTION_TEXT[ca],
+            "status": status,
+            "assigned_team": TEAM_VALUES[team],
+            "resolution_time_hours": res if status == "RESOLVED" else None,
+            "tags": [SCENARIO_TAGS[s], SEVERITY_TAGS[sev], REGION_TAGS[f]]
+        }
+        for (incident_id, ts, s, f, d, e, sev, score, la, lo, well, pers, inj, fat,
+             impact, res, status, rc, ca, team) in zip(*columns)
+    ]
+
+
+def iter_demo_incidents(num_incidents: int = 200, seed: int = 42,
+                        batch_size: int = 1000,
+                        rng: Optional[np.random.Generator] = None) -> Iterator[Dict]:
+    """
+    Stream demo incidents one at a time, generating them in vectorized batches.
+    All batches draw from one generator - pass rng to continue an existing
+    stream (or a spawned child for parallel workers) instead of reseeding.
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    for first in range(0, num_incidents, batch_size):
+        count = min(batch_size, num_incidents - first)
+        yield from _generate_batch(rng, first + 1, count)
 
 
-def generate_demo_dataset(num_incidents: int = 200) -> List[Dict]:
+def generate_demo_dataset(num_incidents: int = 200, seed: int = 42,
+                          rng: Optional[np.random.Generator] = None) -> List[Dict]:
     """Generate a complete demo dataset"""
-    incidents = [generate_incident(i + 1) for i in range(num_incidents)]
+    incidents = list(iter_demo_incidents(num_incidents, seed, rng=rng))
     print(f"Generated {len(incidents)} incidents")
     return incidents
 
@@ -183,8 +284,8 @@ def generate_demo_dataset(num_incidents: int = 200) -> List[Dict]:
 if __name__ == "__main__":
     incidents = generate_demo_dataset(200)
 
-    with open("data/demo_incidents.json", "w") as f:
-        json.dump(incidents, f, indent=2, default=str)
+    with open("data/demo_incidents.json", "wb") as f:
+        f.write(orjson.dumps(incidents))
 
     print(f"Saved {len(incidents)} incidents to data/demo_incidents.json")
 
@@ -4,20 +4,49 @@ Data ingestion script - loads demo incidents into Elasticsearch
 Sets up indices, mappings, and bulk-indexes the generated demo data
 """
 
-import json
 import os
 import sys
 from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+import orjson
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.elastic_client import ElasticClient
 from src.config import config
-from scripts.generate_demo_data import generate_demo_dataset
-
-
-def setup_and_ingest():
+from src.embeddings import DescriptionEmbedder, load_embedder
+from scripts.generate_demo_data import iter_demo_incidents
+
+
+def archive_incidents(incidents: Iterable[Dict], path: Path) -> Iterator[Dict]:
+    """
+    Pass incidents through unchanged while writing them to disk as NDJSON,
+    one compact record per line, so the full dataset is never held in memory.
+    """
+    with open(path, "wb") as f:
+        for incident in incidents:
+            f.write(orjson.dumps(incident))
+            f.write(b"\n")
+            yield incident
+
+
+def embed_descriptions(incidents: Iterable[Dict], embedder: DescriptionEmbedder) -> Iterator[Dict]:
+    """
+    Attach description_embedding to each incident for KNN search. Demo
+    descriptions repeat heavily, so each distinct text is embedded only once.
+    """
+    vectors = {}
+    for incident in incidents:
+        description = incident["description"]
+        if description not in vectors:
+            vectors[description] = embedder.embed_passages([description])[0]
+        incident["description_embedding"] = vectors[description]
+        yield incident
+
+
+def setup_and_ingest(num_incidents: int = 200, archive: bool = True):
     """Main function to set up indices and ingest demo data"""
     print("Oilfield Incident Intelligence - Data Ingestion")
     print("=" * 50)
@@ -45,25 +74,37 @@ def setup_and_ingest():
     print(f"\nSetting up index: {index_name}")
     client.create_incident_index(index_name)
 
-    # Generate demo data
-    print("\nGenerating demo incident data...")
-    incidents = generate_demo_dataset(200)
-    print(f"Generated {len(incidents)} incidents")
-
-    # Save to file for reference
-    data_dir = Path(__file__).parent.parent / "data"
-    data_dir.mkdir(exist_ok=True)
-    data_file = data_dir / "demo_incidents.json"
-
-    with open(data_file, "w") as f:
-        json.dump(incidents, f, indent=2, default=str)
-    print(f"Saved demo data to {data_file}")
-
-    # Bulk index incidents
-    print(f"\nIndexing {len(incidents)} incidents into Elasticsearch...")
-    indexed = client.bulk_index_incidents(index_name, incidents)
+    # Generate demo data lazily - records flow straight into the bulk request
+    print(f"\nGenerating {num_incidents} demo incidents...")
+    incidents = iter_demo_incidents(num_incidents)
+
+    # Optionally keep a copy on disk for reference
+    if archive:
+        data_dir = Path(__file__).parent.parent / "data"
+        data_dir.mkdir(exist_ok=True)
+        data_file = data_dir / "demo_incidents.ndjson"
+        incidents = archive_incidents(incidents, data_file)
+        print(f"Saving demo data to {data_file}")
+
+    # Embeddings for semantic similar-incident search, when a local model is available
+    embedder = load_embedder(config.elastic.embedding_model)
+    if embedder:
+        incidents = embed_descriptions(incidents, embedder)
+        print("Embedding incident descriptions for semantic search")
+    else:
+        print("Embedding model unavailable - indexing without vectors (similar-incident search will use keywords)")
+
+    # Bulk index incidents with refreshes paused and replicas dropped for the load
+    print("\nIndexing incidents into Elasticsearch...")
+    with client.bulk_mode(index_name):
+        indexed = client.bulk_index_incidents(index_name, incidents, thread_count=4)
     print(f"Successfully indexed {indexed} incidents")
 
+    # Pre-aggregated summaries read by the analytics dashboards
+    print("\nStarting summary transforms...")
+    for transform_id in client.create_summary_transforms(index_name):
+        print(f"  {transform_id}")
+
     # Verify indexing
     print("\nVerifying data...")
     stats = client.get_incident_stats(index_name)
@@ -4,7 +4,8 @@ Provides natural language querying over historical incident data
 """
 
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,23 +20,33 @@ class AnalyticsAgent:
     def __init__(self, elastic_client, index_name: str = "oilfield-incidents"):
         self.elastic_client = elastic_client
         self.index_name = index_name
+        # Pre-aggregated summaries maintained by ElasticClient.create_summary_transforms
+        self.trends_index = f"{index_name}-trends-daily"
+        self.mttr_index = f"{index_name}-mttr-by-type"
+        self.risk_index = f"{index_name}-risk-by-field"
 
     def get_incident_trends(self, days: int = 30) -> Dict[str, Any]:
         """Get incident trends over the past N days using ES|QL"""
         query = f"""
-        FROM {self.index_name}
-        | WHERE timestamp >= NOW() - {days} days
+        FROM {self.trends_index}
+        | WHERE day >= ?
         | STATS
-            total_incidents = COUNT(*),
-            avg_severity_score = AVG(severity_score),
-            total_injuries = SUM(injuries),
-            total_fatalities = SUM(fatalities),
-            total_financial_impact = SUM(financial_impact)
+            total_incidents = SUM(total_incidents),
+            severity_score_sum = SUM(severity_score_sum),
+            total_injuries = SUM(total_injuries),
+            total_fatalities = SUM(total_fatalities),
+            total_financial_impact = SUM(total_financial_impact)
           BY incident_type
+        | EVAL avg_severity_score = severity_score_sum / total_incidents
+        | KEEP total_incidents, avg_severity_score, total_injuries, total_fatalities,
+               total_financial_impact, incident_type
         | SORT total_incidents DESC
         """
+        # The window start is bound as a parameter so the query text stays constant.
+        # Summary buckets are UTC days, so the bound is a UTC date, not a time of day
+        since = (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
         try:
-            result = self.elastic_client.esql_query(query)
+            result = self.elastic_client.esql_query(query, params=[since])
             return {
                 "period_days": days,
                 "data": result.get("values", []),
@@ -48,16 +59,19 @@ class AnalyticsAgent:
 
     def get_severity_distribution(self) -> Dict[str, Any]:
         """Get distribution of incidents by severity level"""
-        query = f"""
-        FROM {self.index_name}
-        | STATS count = COUNT(*) BY severity
-        | SORT count DESC
-        """
+        # Plain terms aggregation: cheaper than ES|QL for one low-cardinality count
+        aggs = {"by_severity": {"terms": {"field": "severity", "size": 10}}}
         try:
-            result = self.elastic_client.esql_query(query)
+            result = self.elastic_client.aggregate(self.index_name, aggs)
             return {
-                "distribution": result.get("values", []),
-                "columns": result.get("columns", [])
+                "distribution": [
+                    [bucket["key"], bucket["doc_count"]]
+                    for bucket in result["by_severity"]["buckets"]
+                ],
+                "columns": [
+                    {"name": "severity", "type": "keyword"},
+                    {"name": "count", "type": "long"}
+                ]
             }
         except Exception as e:
             logger.error(f"Severity distribution query failed: {e}")
@@ -66,14 +80,8 @@ class AnalyticsAgent:
     def get_mttr_by_type(self) -> Dict[str, Any]:
         """Get Mean Time To Resolution (MTTR) by incident type"""
         query = f"""
-        FROM {self.index_name}
-        | WHERE status == "RESOLVED"
-        | STATS
-            mttr_hours = AVG(resolution_time_hours),
-            min_resolution = MIN(resolution_time_hours),
-            max_resolution = MAX(resolution_time_hours),
-            total_resolved = COUNT(*)
-          BY incident_type
+        FROM {self.mttr_index}
+        | KEEP mttr_hours, min_resolution, max_resolution, total_resolved, incident_type
         | SORT mttr_hours ASC
         """
         try:
@@ -89,21 +97,16 @@ class AnalyticsAgent:
     def get_high_risk_locations(self, top_n: int = 10) -> Dict[str, Any]:
         """Identify locations with highest incident frequency and severity"""
         query = f"""
-        FROM {self.index_name}
-        | STATS
-            incident_count = COUNT(*),
-            avg_severity = AVG(severity_score),
-            critical_count = COUNT_IF(severity == "CRITICAL"),
-            total_injuries = SUM(injuries)
-          BY location.field_name
+        FROM {self.risk_index}
+        | KEEP incident_count, avg_severity, critical_count, total_injuries, location.field_name
         | EVAL risk_score = (avg_severity * incident_count) + (critical_count * 20)
         | SORT risk_score DESC
-        | LIMIT {top_n}
         """
+        # One row per field, so top_n is applied here rather than baked into the query text
         try:
             result = self.elastic_client.esql_query(query)
             return {
-                "high_risk_locations": result.get("values", []),
+                "high_risk_locations": result.get("values", [])[:top_n],
                 "columns": result.get("columns", [])
             }
         except Exception as e:
@@ -117,7 +120,7 @@ class AnalyticsAgent:
 
         query = f"""
         FROM {self.index_name}
-        | WHERE timestamp >= "{year}-01-01" AND timestamp < "{year + 1}-01-01"
+        | WHERE timestamp >= ? AND timestamp < ?
         | EVAL month = DATE_TRUNC(1 month, timestamp)
         | STATS
             total = COUNT(*),
@@ -129,7 +132,7 @@ class AnalyticsAgent:
         | SORT month ASC
         """
         try:
-            result = self.elastic_client.esql_query(query)
+            result = self.elastic_client.esql_query(query, params=[f"{year}-01-01", f"{year + 1}-01-01"])
             return {
                 "year": year,
                 "monthly_data": result.get("values", []),
@@ -141,64 +144,92 @@ class AnalyticsAgent:
 
     def get_equipment_failure_analysis(self) -> Dict[str, Any]:
         """Analyze equipment failures to identify patterns"""
-        query = f"""
-        FROM {self.index_name}
-        | WHERE incident_type == "EQUIPMENT_FAILURE"
-        | STATS
-            failure_count = COUNT(*),
-            avg_financial_impact = AVG(financial_impact),
-            total_downtime_hours = SUM(resolution_time_hours)
-          BY equipment_involved
-        | SORT failure_count DESC
-        | LIMIT 20
-        """
+        aggs = {
+            "by_equipment": {
+                "terms": {"field": "equipment_involved", "size": 20},
+                "aggs": {
+                    "avg_financial_impact": {"avg": {"field": "financial_impact"}},
+                    "total_downtime_hours": {"sum": {"field": "resolution_time_hours"}}
+                }
+            }
+        }
+        query = {"term": {"incident_type": "EQUIPMENT_FAILURE"}}
         try:
-            result = self.elastic_client.esql_query(query)
+            result = self.elastic_client.aggregate(self.index_name, aggs, query=query)
             return {
-                "equipment_analysis": result.get("values", []),
-                "columns": result.get("columns", [])
+                "equipment_analysis": [
+                    [
+                        bucket["doc_count"],
+                        bucket["avg_financial_impact"]["value"],
+                        bucket["total_downtime_hours"]["value"],
+                        bucket["key"]
+                    ]
+                    for bucket in result["by_equipment"]["buckets"]
+                ],
+                "columns": [
+                    {"name": "failure_count", "type": "long"},
+                    {"name": "avg_financial_impact", "type": "double"},
+                    {"name": "total_downtime_hours", "type": "double"},
+                    {"name": "equipment_involved", "type": "keyword"}
+                ]
             }
         except Exception as e:
             logger.error(f"Equipment analysis query failed: {e}")
             return {"error": str(e)}
 
     def generate_executive_summary(self) -> Dict[str, Any]:
-        """Generate an executive-level summary of incident data"""
-        queries = {
-            "overview": f"""
-                FROM {self.index_name}
-                | STATS
-                    total_incidents = COUNT(*),
-                    open_incidents = COUNT_IF(status == "OPEN"),
-                    critical_open = COUNT_IF(status == "OPEN" AND severity == "CRITICAL"),
-                    total_injuries = SUM(injuries),
-                    total_fatalities = SUM(fatalities),
-                    total_financial_impact = SUM(financial_impact),
-                    avg_resolution_hours = AVG(resolution_time_hours)
-            """,
-            "last_30_days": f"""
-                FROM {self.index_name}
-                | WHERE timestamp >= NOW() - 30 days
-                | STATS
-                    incidents_30d = COUNT(*),
-                    critical_30d = COUNT_IF(severity == "CRITICAL")
-            """
+        """
+        Generate an executive-level summary of incident data.
+        Overall totals, open counts and the last-30-day window are all
+        sub-aggregations of a single search, so this is one round-trip.
+        """
+        critical = {"critical": {"filter": {"term": {"severity": "CRITICAL"}}}}
+        aggs = {
+            "total_incidents": {"value_count": {"field": "incident_id"}},
+            "total_injuries": {"sum": {"field": "injuries"}},
+            "total_fatalities": {"sum": {"field": "fatalities"}},
+            "total_financial_impact": {"sum": {"field": "financial_impact"}},
+            "avg_resolution_hours": {"avg": {"field": "resolution_time_hours"}},
+            "open": {"filter": {"term": {"status": "OPEN"}}, "aggs": critical},
+            "last_30_days": {
+                "filter": {"range": {"timestamp": {"gte": "now-30d"}}},
+                "aggs": critical
+            }
         }
 
-        summary = {}
-        for key, query in queries.items():
-            try:
-                result = self.elastic_client.esql_query(query)
-                values = result.get("values", [[]])
-                columns = result.get("columns", [])
-                if values and columns:
-                    summary[key] = dict(zip(
-                        [c["name"] for c in columns],
-                        values[0]
-                    ))
-            except Exception as e:
-                logger.error(f"Executive summary query '{key}' failed: {e}")
-                summary[key] = {"error": str(e)}
+        try:
+            result = self.elastic_client.aggregate(self.index_name, aggs)
+            summary = {
+                "overview": {
+                    "total_incidents": result["total_incidents"]["value"],
+                    "open_incidents": result["open"]["doc_count"],
+                    "critical_open": result["open"]["critical"]["doc_count"],
+                    "total_injuries": int(result["total_injuries"]["value"]),
+                    "total_fatalities": int(result["total_fatalities"]["value"]),
+                    "total_financial_impact": result["total_financial_impact"]["value"],
+                    "avg_resolution_hours": result["avg_resolution_hours"]["value"]
+                },
+                "last_30_days": {
+                    "incidents_30d": result["last_30_days"]["doc_count"],
+                    "critical_30d": result["last_30_days"]["critical"]["doc_count"]
+                }
+            }
+        except Exception as e:
+            logger.error(f"Executive summary query failed: {e}")
+            summary = {"error": str(e)}
 
         summary["generated_at"] = datetime.now().isoformat()
         return summary
+
+    def dashboard_bundle(self, trend_days: int = 30) -> Dict[str, Any]:
+        """Fetch everything the dashboard view renders in one concurrent batch"""
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            summary = pool.submit(self.generate_executive_summary)
+            severity = pool.submit(self.get_severity_distribution)
+            trends = pool.submit(self.get_incident_trends, trend_days)
+
+        return {
+            "summary": summary.result(),
+            "severity_distribution": severity.result(),
+            "trends": trends.result()
+        }
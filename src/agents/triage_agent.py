@@ -3,14 +3,32 @@ Triage Agent - Core agent for oilfield incident classification and prioritizatio
 Built on top of Elastic Agent Builder framework
 """
 
-import json
-import requests
-from typing import Dict, Any, List, Optional
+import asyncio
+import re
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 from datetime import datetime
 import logging
 
+# HTTP clients are imported where they are first built, keeping module import cheap
+if TYPE_CHECKING:
+    import httpx
+
 logger = logging.getLogger(__name__)
 
+try:
+    import pcre2
+except ImportError:  # pragma: no cover - optional JIT regex backend
+    pcre2 = None
+
+# (connect, read) timeout for Agent Builder calls
+AGENT_TIMEOUT = (3.05, 30)
+
+# Fields returned for each similar incident, by both the KNN and keyword searches
+SIMILAR_INCIDENT_FIELDS = ["incident_id", "timestamp", "incident_type", "severity",
+                           "description", "resolution_time_hours"]
+
 
 SEVERITY_MATRIX = {
     "CRITICAL": {
@@ -57,6 +75,74 @@ INCIDENT_TYPES = [
     "CONTRACTOR_INCIDENT"
 ]
 
+# Precomputed once: the prompt's incident-type list and the per-severity
+# (escalation_required, response_time_hours) pair used by incident reports
+_INCIDENT_TYPES_STR = ", ".join(INCIDENT_TYPES)
+_SEVERITY_DEFAULTS = {
+    severity: (details["escalation_required"], details["response_time_hours"])
+    for severity, details in SEVERITY_MATRIX.items()
+}
+
+
+# Classification prompt with the static parts (incident-type list included)
+# assembled once; only the per-incident fields are filled in per call
+_PROMPT_TEMPLATE = """You are an expert oilfield safety and operations AI assistant.
+
+Analyze this incident report and provide structured classification:
+
+INCIDENT DESCRIPTION:
+{description}
+{context_str}
+
+Provide your analysis in JSON format with these fields:
+1. incident_type: One of """ + _INCIDENT_TYPES_STR + """
+2. severity: CRITICAL/HIGH/MEDIUM/LOW
+3. severity_score: 0-100
+4. immediate_actions: List of 3-5 immediate response actions
+5. root_cause_hypothesis: Most likely root cause
+6. similar_incidents_keywords: Keywords to search historical incidents
+7. escalation_contacts: List of teams to notify
+8. estimated_resolution_hours: Estimated time to resolve
+9. regulatory_reporting_required: true/false
+10. safety_bulletin_required: true/false
+
+Respond ONLY with the JSON object."""
+
+_CONTEXT_TEMPLATE = """
+Additional Context:
+- Location: {location}
+- Equipment: {equipment}
+- Personnel on site: {personnel}
+- Time of incident: {timestamp}
+"""
+
+
+# Keywords used by the rule-based fallback, most severe tier first
+SEVERITY_KEYWORDS = {
+    "CRITICAL": ["blowout", "explosion", "fire", "fatality", "death"],
+    "HIGH": ["injury", "leak", "spill", "h2s", "pressure"],
+    "MEDIUM": ["equipment", "failure", "malfunction"]
+}
+
+# Fallback severity/score by rank; every keyword maps to its tier's rank so a
+# single scan with one compiled alternation finds the most severe match.
+# The lookahead makes matches overlap, so no keyword can hide another.
+_FALLBACK_SEVERITY = [("LOW", 20), ("MEDIUM", 45), ("HIGH", 65), ("CRITICAL", 90)]
+_TIER_RANK = {severity: rank for rank, (severity, _) in enumerate(_FALLBACK_SEVERITY)}
+_KEYWORD_RANK = {
+    kw: _TIER_RANK[tier] for tier, keywords in SEVERITY_KEYWORDS.items() for kw in keywords
+}
+_KEYWORD_PATTERN = "(?=(" + "|".join(map(re.escape, _KEYWORD_RANK)) + "))"
+# PCRE2's JIT matches this ~5x faster than re; both expose the same finditer/group API
+_KEYWORD_RE = pcre2.compile(_KEYWORD_PATTERN, jit=True) if pcre2 else re.compile(_KEYWORD_PATTERN)
+_MAX_RANK = len(_FALLBACK_SEVERITY) - 1
+
+
+def _matched_keywords(desc_lower: str) -> List[str]:
+    """Distinct fallback keywords found in the text, most severe first"""
+    found = dict.fromkeys(m.group(1) for m in _KEYWORD_RE.finditer(desc_lower))
+    return sorted(found, key=_KEYWORD_RANK.get, reverse=True)
+
 
 class TriageAgent:
     """
@@ -65,23 +151,81 @@ class TriageAgent:
     Elasticsearch for historical incident retrieval and pattern matching.
     """
 
-    def __init__(self, agent_endpoint: str, api_key: str, elastic_client=None):
+    def __init__(self, agent_endpoint: str, api_key: str, elastic_client=None,
+                 embedder=None):
         self.agent_endpoint = agent_endpoint
         self.api_key = api_key
         self.elastic_client = elastic_client
+        # Optional src.embeddings.DescriptionEmbedder; enables KNN similar-incident search
+        self.embedder = embedder
         self.conversation_id = None
 
-    def start_conversation(self) -> str:
-        """Start a new conversation with the Elastic Agent"""
-        headers = {
-            "Authorization": f"ApiKey {self.api_key}",
+        # Pooled keep-alive session so repeated calls skip the TCP/TLS handshake.
+        # Bodies are pre-encoded with orjson, so Content-Type is set here
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=3)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._headers = {
+            "Authorization": f"ApiKey {api_key}",
             "Content-Type": "application/json"
         }
-        response = requests.post(
+        self._session.headers.update(self._headers)
+        # Built lazily for the running event loop; its connections belong to
+        # that loop, so a call from a different loop gets a fresh client
+        self._async_client: Optional["httpx.AsyncClient"] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def close(self):
+        """Release pooled connections to the agent endpoint"""
+        self._session.close()
+        loop = self._async_loop
+        if self._async_client is not None and not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(self._async_client.aclose())
+        self._async_client = None
+        self._async_loop = None
+
+    async def aclose(self):
+        """Release the async client's connections"""
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_loop = None
+
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            import httpx
+
+            # A client left over from an earlier loop (e.g. a previous
+            # asyncio.run) can't be awaited on this one, so it is dropped
+            self._async_loop = loop
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                # Only our own headers: requests' defaults include Connection,
+                # which HTTP/2 forbids (RFC 9113 8.2.2)
+                headers=self._headers,
+                timeout=httpx.Timeout(AGENT_TIMEOUT[1], connect=AGENT_TIMEOUT[0]),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+        return self._async_client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start_conversation(self) -> str:
+        """Start a new conversation with the Elastic Agent"""
+        response = self._session.post(
             f"{self.agent_endpoint}/conversations",
-            headers=headers
+            timeout=AGENT_TIMEOUT
         )
-        data = response.json()
+        data = orjson.loads(response.content)
         self.conversation_id = data.get("id")
         return self.conversation_id
 
@@ -91,76 +235,83 @@ class TriageAgent:
         Classify an incident using the Elastic Agent Builder.
         Returns structured classification with severity, type, and recommendations.
         """
-        prompt = self._build_classification_prompt(incident_description, additional_context)
+        return self._classify(incident_description, additional_context, self.conversation_id)
 
-        headers = {
-            "Authorization": f"ApiKey {self.api_key}",
-            "Content-Type": "application/json"
-        }
+    def _classify(self, incident_description: str, additional_context: Optional[Dict],
+                  conversation_id: Optional[str]) -> Dict[str, Any]:
+        """Send one classification request within the given conversation (None starts a new one)"""
+        now_iso = datetime.now().isoformat()
+        prompt = self._build_classification_prompt(incident_description, additional_context, now_iso)
 
         payload = {
             "message": prompt,
-            "conversationId": self.conversation_id
+            "conversationId": conversation_id
         }
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.agent_endpoint}/chat",
-                headers=headers,
-                json=payload
+                data=orjson.dumps(payload),
+                timeout=AGENT_TIMEOUT
             )
-            agent_response = response.json()
-            return self._parse_classification_response(agent_response, incident_description)
+            agent_response = orjson.loads(response.content)
+            return self._parse_classification_response(agent_response, incident_description, now_iso)
         except Exception as e:
             logger.error(f"Agent classification failed: {e}")
-            return self._fallback_classification(incident_description)
+            return self._fallback_classification(incident_description, now_iso)
+
+    def classify_incidents_batch(self, incident_descriptions: List[str],
+                                 contexts: Optional[List[Optional[Dict]]] = None,
+                                 max_workers: int = 16) -> List[Dict[str, Any]]:
+        """
+        Classify many incidents concurrently over the shared session's
+        connection pool. Each incident is sent outside the agent's current
+        conversation, so classifications don't see each other's prompts.
+        Results are returned in input order; failures fall back to
+        rule-based classification like classify_incident. contexts, if given,
+        must hold one entry (or None) per description.
+        """
+        if not incident_descriptions:
+            return []
+        if contexts is None:
+            contexts = [None] * len(incident_descriptions)
+        elif len(contexts) != len(incident_descriptions):
+            raise ValueError(
+                f"Got {len(contexts)} contexts for {len(incident_descriptions)} incident descriptions"
+            )
+
+        workers = min(max_workers, len(incident_descriptions))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self._classify, incident_descriptions, contexts,
+                                 [None] * len(incident_descriptions)))
 
     def _build_classification_prompt(self, description: str,
-                                     context: Optional[Dict] = None) -> str:
+                                     context: Optional[Dict] = None,
+                                     now_iso: Optional[str] = None) -> str:
         """Build a structured prompt for incident classification"""
         context_str = ""
         if context:
-            context_str = f"""
-Additional Context:
-- Location: {context.get('location', 'Unknown')}
-- Equipment: {context.get('equipment', 'Unknown')}
-- Personnel on site: {context.get('personnel', 'Unknown')}
-- Time of incident: {context.get('timestamp', datetime.now().isoformat())}
-"""
-
-        return f"""You are an expert oilfield safety and operations AI assistant.
-
-Analyze this incident report and provide structured classification:
-
-INCIDENT DESCRIPTION:
-{description}
-{context_str}
-
-Provide your analysis in JSON format with these fields:
-1. incident_type: One of {INCIDENT_TYPES}
-2. severity: CRITICAL/HIGH/MEDIUM/LOW
-3. severity_score: 0-100
-4. immediate_actions: List of 3-5 immediate response actions
-5. root_cause_hypothesis: Most likely root cause
-6. similar_incidents_keywords: Keywords to search historical incidents
-7. escalation_contacts: List of teams to notify
-8. estimated_resolution_hours: Estimated time to resolve
-9. regulatory_reporting_required: true/false
-10. safety_bulletin_required: true/false
+            context_str = _CONTEXT_TEMPLATE.format_map({
+                "location": context.get("location", "Unknown"),
+                "equipment": context.get("equipment", "Unknown"),
+                "personnel": context.get("personnel", "Unknown"),
+                "timestamp": context.get("timestamp", now_iso or datetime.now().isoformat()),
+            })
 
-Respond ONLY with the JSON object."""
+        return _PROMPT_TEMPLATE.format_map({"description": description, "context_str": context_str})
 
-    def _parse_classification_response(self, response: Dict,
-                                        original_desc: str) -> Dict[str, Any]:
+    def _parse_classification_response(self, response: Dict, original_desc: str,
+                                        now_iso: Optional[str] = None) -> Dict[str, Any]:
         """Parse the agent response into structured incident data"""
         try:
             content = response.get("message", {}).get("content", "{}")
-            if isinstance(content, str):
-                # Extract JSON from response
-                start = content.find("{")
-                end = content.rfind("}") + 1
+            if isinstance(content, (str, bytes)):
+                # Extract JSON from response; orjson parses the view without a slice copy
+                raw = content.encode() if isinstance(content, str) else content
+                start = raw.find(b"{")
+                end = raw.rfind(b"}") + 1
                 if start >= 0 and end > start:
-                    classification = json.loads(content[start:end])
+                    classification = orjson.loads(memoryview(raw)[start:end])
                 else:
                     raise ValueError("No JSON found in response")
             else:
@@ -168,7 +319,7 @@ Respond ONLY with the JSON object."""
 
             # Enrich with metadata
             classification["original_description"] = original_desc
-            classification["triage_timestamp"] = datetime.now().isoformat()
+            classification["triage_timestamp"] = now_iso or datetime.now().isoformat()
             classification["triage_agent_version"] = "1.0.0"
 
             # Get severity details
@@ -180,25 +331,20 @@ Respond ONLY with the JSON object."""
 
         except Exception as e:
             logger.error(f"Failed to parse agent response: {e}")
-            return self._fallback_classification(original_desc)
+            return self._fallback_classification(original_desc, now_iso)
 
-    def _fallback_classification(self, description: str) -> Dict[str, Any]:
+    def _fallback_classification(self, description: str,
+                                 now_iso: Optional[str] = None) -> Dict[str, Any]:
         """Rule-based fallback classification when agent is unavailable"""
         desc_lower = description.lower()
 
-        # Simple keyword-based severity
-        if any(kw in desc_lower for kw in ["blowout", "explosion", "fire", "fatality", "death"]):
-            severity = "CRITICAL"
-            score = 90
-        elif any(kw in desc_lower for kw in ["injury", "leak", "spill", "h2s", "pressure"]):
-            severity = "HIGH"
-            score = 65
-        elif any(kw in desc_lower for kw in ["equipment", "failure", "malfunction"]):
-            severity = "MEDIUM"
-            score = 45
-        else:
-            severity = "LOW"
-            score = 20
+        # Simple keyword-based severity: one pass, stop at the first CRITICAL hit
+        rank = 0
+        for match in _KEYWORD_RE.finditer(desc_lower):
+            rank = max(rank, _KEYWORD_RANK[match.group(1)])
+            if rank == _MAX_RANK:
+                break
+        severity, score = _FALLBACK_SEVERITY[rank]
 
         return {
             "incident_type": "EQUIPMENT_FAILURE",
@@ -211,39 +357,145 @@ Respond ONLY with the JSON object."""
                 "Document initial observations"
             ],
             "root_cause_hypothesis": "Under investigation - agent unavailable for detailed analysis",
-            "triage_timestamp": datetime.now().isoformat(),
+            "triage_timestamp": now_iso or datetime.now().isoformat(),
             "triage_agent_version": "1.0.0-fallback",
             "original_description": description
         }
 
     def get_similar_incidents(self, keywords: List[str],
-                              index_name: str = "oilfield-incidents") -> List[Dict]:
-        """Search for similar historical incidents using ES|QL"""
+                              index_name: str = "oilfield-incidents",
+                              description: Optional[str] = None) -> List[Dict]:
+        """
+        Search for similar historical incidents.
+        With an embedder and the incident description this is a KNN search over
+        description_embedding; otherwise (or if that fails or finds nothing,
+        e.g. an index ingested without vectors) it falls back to ES|QL, with
+        the keywords bound as a query parameter and matched through the
+        analyzed description field. Both paths return dicts keyed by
+        SIMILAR_INCIDENT_FIELDS.
+        """
         if not self.elastic_client:
             return []
 
-        keyword_filter = " OR ".join(keywords[:3])  # Use top 3 keywords
+        if self.embedder and description:
+            try:
+                vector = self.embedder.embed_query(description)
+                hits = self.elastic_client.semantic_search(index_name, vector, k=5,
+                                                           source=SIMILAR_INCIDENT_FIELDS)
+                if hits:
+                    return [{field: hit.get(field) for field in SIMILAR_INCIDENT_FIELDS}
+                            for hit in hits]
+            except Exception as e:
+                logger.error(f"Semantic search failed, falling back to keywords: {e}")
+
+        if not keywords:
+            return []
+
+        search_text = " ".join(keywords[:3])  # Use top 3 keywords
         esql_query = f"""
         FROM {index_name}
-        | WHERE description LIKE "*{keywords[0]}*"
+        | WHERE MATCH(description, ?)
         | SORT severity_score DESC
         | LIMIT 5
-        | KEEP incident_id, timestamp, incident_type, severity, description, resolution_time_hours
+        | KEEP {", ".join(SIMILAR_INCIDENT_FIELDS)}
         """
 
         try:
-            results = self.elastic_client.esql_query(esql_query)
-            return results.get("values", [])
+            results = self.elastic_client.esql_query(esql_query, params=[search_text])
+            names = [col["name"] for col in results.get("columns", [])]
+            return [dict(zip(names, row)) for row in results.get("values", [])]
         except Exception as e:
             logger.error(f"Failed to retrieve similar incidents: {e}")
             return []
 
+    async def aclassify_incident(self, incident_description: str,
+                                 additional_context: Optional[Dict] = None) -> Dict[str, Any]:
+        """Async variant of classify_incident over a shared httpx.AsyncClient"""
+        now_iso = datetime.now().isoformat()
+        prompt = self._build_classification_prompt(incident_description, additional_context, now_iso)
+
+        payload = {
+            "message": prompt,
+            "conversationId": self.conversation_id
+        }
+
+        try:
+            response = await self._get_async_client().post(
+                f"{self.agent_endpoint}/chat",
+                content=orjson.dumps(payload)
+            )
+            agent_response = orjson.loads(response.content)
+            return self._parse_classification_response(agent_response, incident_description, now_iso)
+        except Exception as e:
+            logger.error(f"Agent classification failed: {e}")
+            return self._fallback_classification(incident_description, now_iso)
+
+    async def aget_similar_incidents(self, keywords: List[str],
+                                     index_name: str = "oilfield-incidents",
+                                     description: Optional[str] = None) -> List[Dict]:
+        """Async variant of get_similar_incidents; the search runs in a worker thread"""
+        return await asyncio.to_thread(self.get_similar_incidents, keywords, index_name, description)
+
+    async def atriage_incident(self, incident_description: str,
+                               additional_context: Optional[Dict] = None,
+                               index_name: str = "oilfield-incidents") -> Dict[str, Any]:
+        """
+        Classify an incident and gather historical context concurrently.
+        The agent call, the index statistics and - when it can run from the
+        description alone (embedder available, or known fallback keywords in
+        the text) - the similar-incident lookup are issued together, so
+        latency is roughly the slowest call, not the sum.
+        """
+        speculative_keywords = _matched_keywords(incident_description.lower())
+
+        async def no_result():
+            return None
+
+        agent_task = self.aclassify_incident(incident_description, additional_context)
+        speculate = bool(self.embedder) or bool(speculative_keywords)
+        similar_task = (self.aget_similar_incidents(speculative_keywords, index_name,
+                                                    incident_description)
+                        if speculate else no_result())
+        stats_task = (asyncio.to_thread(self.elastic_client.get_incident_stats, index_name)
+                      if self.elastic_client else no_result())
+
+        classification, similar, stats = await asyncio.gather(
+            agent_task, similar_task, stats_task, return_exceptions=True
+        )
+        if isinstance(classification, Exception):
+            logger.error(f"Agent classification failed: {classification}")
+            classification = self._fallback_classification(incident_description)
+        if isinstance(stats, Exception):
+            logger.error(f"Failed to retrieve incident stats: {stats}")
+            stats = None
+        if isinstance(similar, Exception):
+            logger.error(f"Failed to retrieve similar incidents: {similar}")
+            similar = None
+
+        # Nothing speculated, or it found nothing - search with the agent's own
+        # keywords, unless the speculative lookup already tried exactly those
+        if not similar:
+            keywords = classification.get("similar_incidents_keywords") or speculative_keywords
+            if keywords and (similar is None or keywords != speculative_keywords):
+                similar = await self.aget_similar_incidents(keywords, index_name)
+            similar = similar or []
+
+        return {
+            "classification": classification,
+            "similar_incidents": similar,
+            "incident_stats": stats
+        }
+
     def generate_incident_report(self, classification: Dict[str, Any],
                                   incident_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate a comprehensive incident report"""
+        now = datetime.now()
+        escalation_required, response_deadline = _SEVERITY_DEFAULTS.get(
+            classification.get("severity", "MEDIUM"), (False, 24)
+        )
         return {
-            "report_id": f"RPT-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
-            "generated_at": datetime.now().isoformat(),
+            "report_id": f"RPT-{now.strftime('%Y%m%d-%H%M%S')}",
+            "generated_at": now.isoformat(),
             "incident_summary": {
                 "id": incident_data.get("incident_id"),
                 "type": classification.get("incident_type"),
@@ -254,11 +506,7 @@ Respond ONLY with the JSON object."""
             },
             "triage_results": classification,
             "recommended_actions": classification.get("immediate_actions", []),
-            "escalation_required": SEVERITY_MATRIX.get(
-                classification.get("severity", "MEDIUM"), {}
-            ).get("escalation_required", False),
-            "response_deadline": SEVERITY_MATRIX.get(
-                classification.get("severity", "MEDIUM"), {}
-            ).get("response_time_hours", 24),
+            "escalation_required": escalation_required,
+            "response_deadline": response_deadline,
             "regulatory_reporting": classification.get("regulatory_reporting_required", False)
         }
@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-@dataclass
+@dataclass(slots=True)
 class ElasticConfig:
     """Elasticsearch connection configuration"""
     url: str
@@ -20,7 +20,7 @@ class ElasticConfig:
     embedding_model: str = "multilingual-e5-small"
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentConfig:
     """Elastic Agent Builder configuration"""
     agent_id: str
@@ -31,6 +31,8 @@ class AgentConfig:
 class Config:
     """Main configuration class"""
 
+    __slots__ = ("elastic", "agent", "debug", "log_level")
+
     def __init__(self):
         self.elastic = ElasticConfig(
             url=os.getenv("ELASTICSEARCH_URL", ""),
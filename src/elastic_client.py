@@ -3,23 +3,56 @@ Elasticsearch client wrapper for Oilfield Incident Intelligence
 Handles connections, index management, and search operations
 """
 
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
+import time
+
+# elasticsearch pulls in a large module tree; it is imported on first use so
+# importing this module stays cheap for workers that never connect
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
 
 logger = logging.getLogger(__name__)
 
+# Seconds get_incident_stats results are reused before re-querying
+STATS_CACHE_TTL = 30
+
+# Ingest-time field the summary transforms use to find new or changed incidents
+SYNC_FIELD = "event.ingested"
+
+
+@lru_cache(maxsize=4)
+def _es_client(url: str, api_key: str) -> "Elasticsearch":
+    """
+    Shared low-level client per cluster/credential pair. urllib3 keeps
+    connections alive across calls, gzip shrinks the ES|QL/search/KNN
+    response bodies, and orjson handles request/response (de)serialization
+    """
+    from elasticsearch import Elasticsearch
+    from elasticsearch.serializer import OrjsonSerializer
+
+    return Elasticsearch(
+        url,
+        api_key=api_key,
+        serializer=OrjsonSerializer(),
+        request_timeout=30,
+        http_compress=True,
+        max_retries=3,
+        retry_on_timeout=True,
+        connections_per_node=25,
+    )
+
 
 class ElasticClient:
     """Wrapper around Elasticsearch client with oilfield-specific methods"""
 
     def __init__(self, url: str, api_key: str):
-        self.client = Elasticsearch(
-            url,
-            api_key=api_key,
-            request_timeout=30,
-        )
+        # Every wrapper for the same cluster shares one connection pool
+        self.client = _es_client(url, api_key)
+        # index_name -> (expires_at, aggregations) for get_incident_stats
+        self._stats_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
         self._verify_connection()
 
     def _verify_connection(self):
@@ -32,7 +65,13 @@ class ElasticClient:
             raise
 
     def create_incident_index(self, index_name: str) -> bool:
-        """Create the incidents index with proper mappings"""
+        """
+        Create the incidents index with proper mappings.
+        Numeric fields use the narrowest type that holds them (byte/short, and
+        scaled_float at the precision the data is rounded to) to keep
+        doc-values small for the STATS and aggregation scans.
+        """
+        pipeline_id = self.create_ingest_pipeline(index_name)
         mapping = {
             "mappings": {
                 "properties": {
@@ -47,7 +86,7 @@ class ElasticClient:
                     },
                     "incident_type": {"type": "keyword"},
                     "severity": {"type": "keyword"},
-                    "severity_score": {"type": "float"},
+                    "severity_score": {"type": "short"},
                     "description": {
                         "type": "text",
                         "analyzer": "english"
@@ -59,30 +98,160 @@ class ElasticClient:
                         "similarity": "cosine"
                     },
                     "equipment_involved": {"type": "keyword"},
-                    "personnel_count": {"type": "integer"},
-                    "injuries": {"type": "integer"},
-                    "fatalities": {"type": "integer"},
-                    "financial_impact": {"type": "float"},
+                    "personnel_count": {"type": "byte"},
+                    "injuries": {"type": "byte"},
+                    "fatalities": {"type": "byte"},
+                    "financial_impact": {"type": "scaled_float", "scaling_factor": 100},
                     "root_cause": {"type": "text"},
                     "corrective_actions": {"type": "text"},
                     "status": {"type": "keyword"},
                     "assigned_team": {"type": "keyword"},
-                    "resolution_time_hours": {"type": "float"},
-                    "tags": {"type": "keyword"}
+                    "resolution_time_hours": {"type": "scaled_float", "scaling_factor": 10},
+                    "tags": {"type": "keyword"},
+                    "event": {
+                        "properties": {
+                            "ingested": {"type": "date"}
+                        }
+                    }
                 }
             },
             "settings": {
                 "number_of_shards": 1,
-                "number_of_replicas": 0
+                "number_of_replicas": 0,
+                "default_pipeline": pipeline_id
             }
         }
 
+        created = False
         if not self.client.indices.exists(index=index_name):
             self.client.indices.create(index=index_name, body=mapping)
             logger.info(f"Created index: {index_name}")
-            return True
-        logger.info(f"Index {index_name} already exists")
-        return False
+            created = True
+        else:
+            logger.info(f"Index {index_name} already exists")
+            self._upgrade_ingest_timestamp(index_name, pipeline_id,
+                                           mapping["mappings"]["properties"]["event"])
+        self.create_resolved_alias(index_name)
+        return created
+
+    def create_ingest_pipeline(self, index_name: str) -> str:
+        """
+        Create the {index}-ingest pipeline, which stamps every write with
+        event.ingested. The summary transforms sync on that field, so
+        re-ingested, updated and back-dated incidents are all picked up.
+        Returns the pipeline id.
+        """
+        pipeline_id = f"{index_name}-ingest"
+        self.client.ingest.put_pipeline(
+            id=pipeline_id,
+            description="Stamp incidents with their ingest time for transform sync",
+            processors=[{"set": {"field": "event.ingested", "value": "{{_ingest.timestamp}}"}}]
+        )
+        return pipeline_id
+
+    def _upgrade_ingest_timestamp(self, index_name: str, pipeline_id: str,
+                                  event_mapping: Dict[str, Any]):
+        """Add event.ingested to an index created before it existed, backfilling in the background"""
+        self.client.indices.put_mapping(index=index_name, properties={"event": event_mapping})
+        self.client.indices.put_settings(index=index_name,
+                                         settings={"default_pipeline": pipeline_id})
+        self.client.update_by_query(
+            index=index_name,
+            pipeline=pipeline_id,
+            query={"bool": {"must_not": {"exists": {"field": "event.ingested"}}}},
+            conflicts="proceed",
+            wait_for_completion=False
+        )
+
+    def create_resolved_alias(self, index_name: str):
+        """
+        Add the filtered alias {index}-resolved, which the MTTR transform reads
+        so its term filter skips unresolved docs
+        """
+        self.client.indices.put_alias(
+            index=index_name, name=f"{index_name}-resolved",
+            filter={"term": {"status": "RESOLVED"}}
+        )
+
+    def create_summary_transforms(self, index_name: str) -> List[str]:
+        """
+        Create and start continuous transforms that pre-aggregate the incident
+        index into small summary indices for the analytics dashboards:
+        {index}-trends-daily, {index}-mttr-by-type and {index}-risk-by-field.
+        Transforms sync on event.ingested (see create_ingest_pipeline), not on
+        the incident timestamp, so late or updated documents still land in
+        the summaries. Returns the transform ids. Existing transforms are left
+        as they are, except ones still syncing on another field, which are
+        rebuilt.
+        """
+        count = {"value_count": {"field": "incident_id"}}
+        transforms = {
+            f"{index_name}-trends-daily": {
+                "group_by": {
+                    "incident_type": {"terms": {"field": "incident_type"}},
+                    "day": {"date_histogram": {"field": "timestamp", "calendar_interval": "1d"}}
+                },
+                "aggregations": {
+                    "total_incidents": count,
+                    "severity_score_sum": {"sum": {"field": "severity_score"}},
+                    "total_injuries": {"sum": {"field": "injuries"}},
+                    "total_fatalities": {"sum": {"field": "fatalities"}},
+                    "total_financial_impact": {"sum": {"field": "financial_impact"}}
+                }
+            },
+            f"{index_name}-mttr-by-type": {
+                "source": f"{index_name}-resolved",
+                "group_by": {
+                    "incident_type": {"terms": {"field": "incident_type"}}
+                },
+                "aggregations": {
+                    "mttr_hours": {"avg": {"field": "resolution_time_hours"}},
+                    "min_resolution": {"min": {"field": "resolution_time_hours"}},
+                    "max_resolution": {"max": {"field": "resolution_time_hours"}},
+                    "total_resolved": count
+                }
+            },
+            f"{index_name}-risk-by-field": {
+                "group_by": {
+                    "location.field_name": {"terms": {"field": "location.field_name"}}
+                },
+                "aggregations": {
+                    "incident_count": count,
+                    "avg_severity": {"avg": {"field": "severity_score"}},
+                    "critical_count": {"filter": {"term": {"severity": "CRITICAL"}}},
+                    "total_injuries": {"sum": {"field": "injuries"}}
+                }
+            }
+        }
+
+        # 409 means the transform already exists / is already running
+        client = self.client.options(ignore_status=409)
+        for transform_id, spec in transforms.items():
+            self._drop_stale_transform(transform_id)
+            client.transform.put_transform(
+                transform_id=transform_id,
+                source={"index": [spec.get("source", index_name)]},
+                dest={"index": transform_id},
+                pivot={"group_by": spec["group_by"], "aggregations": spec["aggregations"]},
+                sync={"time": {"field": SYNC_FIELD, "delay": "60s"}},
+                frequency="1m"
+            )
+            client.transform.start_transform(transform_id=transform_id)
+            logger.info(f"Summary transform ready: {transform_id}")
+        return list(transforms)
+
+    def _drop_stale_transform(self, transform_id: str):
+        """Delete a transform (and its summary index) created with a different sync field"""
+        existing = self.client.options(ignore_status=404).transform.get_transform(
+            transform_id=transform_id
+        ).get("transforms", [])
+        if not existing:
+            return
+        sync_field = existing[0].get("sync", {}).get("time", {}).get("field")
+        if sync_field != SYNC_FIELD:
+            logger.info(f"Rebuilding transform {transform_id} (synced on {sync_field})")
+            self.client.transform.delete_transform(transform_id=transform_id, force=True,
+                                                   delete_dest_index=True)
 
     def index_incident(self, index_name: str, incident: Dict[str, Any]) -> str:
         """Index a single incident document"""
@@ -91,25 +260,84 @@ class ElasticClient:
             id=incident.get("incident_id"),
             document=incident
         )
+        self._stats_cache.pop(index_name, None)
         return response["_id"]
 
-    def bulk_index_incidents(self, index_name: str, incidents: List[Dict]) -> int:
-        """Bulk index multiple incidents"""
-        actions = [
+    def bulk_index_incidents(self, index_name: str, incidents: Iterable[Dict],
+                             thread_count: int = 8, chunk_size: int = 500) -> int:
+        """
+        Bulk index multiple incidents, sending chunks concurrently so several
+        bulk requests are in flight at once. Larger chunks/more threads raise
+        throughput at the cost of client memory.
+        """
+        # Generator, not a list: parallel_bulk pulls actions chunk by chunk, so
+        # a streamed incident iterable is never fully held in memory
+        actions = (
             {
                 "_index": index_name,
                 "_id": inc.get("incident_id"),
                 "_source": inc
             }
             for inc in incidents
-        ]
-        success, errors = bulk(self.client, actions)
-        logger.info(f"Indexed {success} incidents, {len(errors)} errors")
+        )
+        from elasticsearch.helpers import parallel_bulk
+
+        success = 0
+        errors = 0
+        for ok, item in parallel_bulk(self.client, actions, thread_count=thread_count,
+                                      chunk_size=chunk_size, queue_size=4,
+                                      raise_on_error=False):
+            if ok:
+                success += 1
+            else:
+                errors += 1
+                logger.warning(f"Failed to index incident: {item}")
+        logger.info(f"Indexed {success} incidents, {errors} errors")
+        self._stats_cache.pop(index_name, None)
         return success
 
+    def begin_bulk_mode(self, index_name: str) -> Dict[str, Any]:
+        """
+        Pause refreshes and drop replicas ahead of a large bulk load, so the
+        load writes fewer, larger segments. Returns the previous settings
+        for end_bulk_mode to restore.
+        """
+        current = self.client.indices.get_settings(
+            index=index_name, flat_settings=True, include_defaults=True,
+            name=["index.refresh_interval", "index.number_of_replicas"]
+        )[index_name]
+        previous = {**current.get("defaults", {}), **current.get("settings", {})}
+        self.client.indices.put_settings(
+            index=index_name,
+            settings={"refresh_interval": "-1", "number_of_replicas": 0}
+        )
+        return {
+            "refresh_interval": previous.get("index.refresh_interval"),
+            "number_of_replicas": previous.get("index.number_of_replicas", 1),
+        }
+
+    def end_bulk_mode(self, index_name: str, previous: Optional[Dict[str, Any]] = None):
+        """Restore settings changed by begin_bulk_mode, then refresh and merge the loaded segments"""
+        previous = previous or {"refresh_interval": None, "number_of_replicas": 1}
+        self.client.indices.put_settings(index=index_name, settings=previous)
+        self.client.indices.refresh(index=index_name)
+        self.client.options(request_timeout=600).indices.forcemerge(
+            index=index_name, max_num_segments=1
+        )
+
+    @contextmanager
+    def bulk_mode(self, index_name: str) -> Iterator[None]:
+        """Context manager around begin_bulk_mode/end_bulk_mode for large loads"""
+        previous = self.begin_bulk_mode(index_name)
+        try:
+            yield
+        finally:
+            self.end_bulk_mode(index_name, previous)
+
     def semantic_search(self, index_name: str, query_vector: List[float],
-                        k: int = 10, filters: Optional[Dict] = None) -> List[Dict]:
-        """Perform semantic/KNN search on incident descriptions"""
+                        k: int = 10, filters: Optional[Dict] = None,
+                        source: Optional[List[str]] = None) -> List[Dict]:
+        """Perform semantic/KNN search on incident descriptions, returning the source fields listed"""
         knn_query = {
             "field": "description_embedding",
             "query_vector": query_vector,
@@ -123,34 +351,52 @@ class ElasticClient:
         response = self.client.search(
             index=index_name,
             knn=knn_query,
-            source=["incident_id", "timestamp", "incident_type", "severity",
-                    "description", "location", "status"]
+            source=source or ["incident_id", "timestamp", "incident_type", "severity",
+                              "description", "location", "status"]
         )
         return [hit["_source"] for hit in response["hits"]["hits"]]
 
-    def esql_query(self, query: str) -> Dict[str, Any]:
-        """Execute an ES|QL query"""
-        response = self.client.esql.query(query=query)
+    def esql_query(self, query: str, params: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """Execute an ES|QL query, binding any positional ? placeholders to params"""
+        response = self.client.esql.query(query=query, params=params)
         return response
 
+    def aggregate(self, index_name: str, aggs: Dict[str, Any],
+                  query: Optional[Dict] = None) -> Dict[str, Any]:
+        """Run a size=0 aggregation search, served from the shard request cache when possible"""
+        response = self.client.search(
+            index=index_name,
+            size=0,
+            aggs=aggs,
+            query=query,
+            request_cache=True
+        )
+        return response["aggregations"]
+
     def get_incident_stats(self, index_name: str) -> Dict[str, Any]:
-        """Get aggregate statistics for incidents"""
-        agg_query = {
-            "aggs": {
-                "by_severity": {
-                    "terms": {"field": "severity"}
-                },
-                "by_type": {
-                    "terms": {"field": "incident_type"}
-                },
-                "avg_resolution_time": {
-                    "avg": {"field": "resolution_time_hours"}
-                },
-                "total_financial_impact": {
-                    "sum": {"field": "financial_impact"}
-                }
+        """
+        Get aggregate statistics for incidents. Results are reused for
+        STATS_CACHE_TTL seconds per index, so polling dashboards don't re-run
+        the whole-index aggregations on every refresh.
+        """
+        now = time.monotonic()
+        cached = self._stats_cache.get(index_name)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        stats = self.aggregate(index_name, {
+            "by_severity": {
+                "terms": {"field": "severity"}
             },
-            "size": 0
-        }
-        response = self.client.search(index=index_name, body=agg_query)
-        return response["aggregations"]
+            "by_type": {
+                "terms": {"field": "incident_type"}
+            },
+            "avg_resolution_time": {
+                "avg": {"field": "resolution_time_hours"}
+            },
+            "total_financial_impact": {
+                "sum": {"field": "financial_impact"}
+            }
+        })
+        self._stats_cache[index_name] = (now + STATS_CACHE_TTL, stats)
+        return stats
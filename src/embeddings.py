@@ -0,0 +1,101 @@
+"""
+Local text embeddings for semantic incident search
+Produces the 384-dim vectors stored in the description_embedding field
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "oilfield-incident-intelligence" / "onnx"
+
+
+def _export_quantized(model_id: str, model_dir: Path, quantized_path: Path):
+    """One-time ONNX export of the model plus dynamic int8 weight quantization"""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from transformers import AutoTokenizer
+
+    logger.info(f"Exporting {model_id} to ONNX (int8) in {model_dir}")
+    model = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+    model.save_pretrained(model_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(model_dir)
+    quantize_dynamic(model_dir / "model.onnx", quantized_path, weight_type=QuantType.QInt8)
+
+
+class DescriptionEmbedder:
+    """
+    Embeds incident descriptions with a multilingual-e5 model exported to ONNX
+    and dynamically quantized to int8, run on ONNX Runtime's CPU provider.
+    e5 models expect "query: " / "passage: " prefixes, so searches and
+    indexed documents are embedded through separate methods.
+    """
+
+    def __init__(self, model_name: str = "multilingual-e5-small",
+                 cache_dir: Optional[Path] = None, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        if "/" not in model_name:
+            model_name = f"intfloat/{model_name}"
+        model_dir = (cache_dir or DEFAULT_CACHE_DIR) / model_name.replace("/", "--")
+        quantized_path = model_dir / "model_int8.onnx"
+        if not quantized_path.exists():
+            _export_quantized(model_name, model_dir, quantized_path)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or min(4, os.cpu_count() or 1)
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(quantized_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self._input_names = [i.name for i in self.session.get_inputs()]
+        # Repeated descriptions (re-triage, retries) skip inference
+        self.embed_query = lru_cache(maxsize=1024)(self._embed_query)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Mean-pool the last hidden state over real tokens and L2-normalize"""
+        batch = self.tokenizer(texts, padding=True, truncation=True,
+                               max_length=512, return_tensors="np")
+        # BERT-graph exports require token_type_ids, which the XLM-R tokenizer
+        # of multilingual-e5 doesn't produce; single-segment input means zeros
+        input_ids = batch["input_ids"].astype(np.int64)
+        feeds = {
+            name: batch[name].astype(np.int64) if name in batch else np.zeros_like(input_ids)
+            for name in self._input_names
+        }
+        hidden = self.session.run(None, feeds)[0]
+        mask = batch["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.linalg.norm(pooled, axis=1, keepdims=True)
+
+    def _embed_query(self, text: str) -> List[float]:
+        """Embed a search description"""
+        return self._encode([f"query: {text}"])[0].tolist()
+
+    def embed_passages(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """Embed descriptions for indexing"""
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            chunk = [f"passage: {text}" for text in texts[start:start + batch_size]]
+            vectors.extend(self._encode(chunk).tolist())
+        return vectors
+
+
+def load_embedder(model_name: str) -> Optional[DescriptionEmbedder]:
+    """Load the embedder, or return None when the embedding backend isn't installed"""
+    try:
+        return DescriptionEmbedder(model_name)
+    except ImportError:
+        logger.warning("Embedding dependencies not installed (requirements-embeddings.txt) - "
+                       "similar incident search will use keywords only")
+    except Exception as e:
+        logger.error(f"Failed to load embedding model {model_name}: {e}")
+    return None